@@ -1,8 +1,11 @@
+import re
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from src.config import MODEL_ID
-from src.storage import PlantDB
+from itertools import chain
+from src.config import MODEL_ID, LOG_LEVEL, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, GEMINI_API_KEY, SHEET_CREDENTIALS
 from src.weather import get_forecast
-from src.agent import PlantAgent
 from src.telegram_bot import send_alert
 
 # Action icons for Telegram messages
@@ -17,6 +20,17 @@ ACTION_ICONS = {
     'CHECK': '🔍',
 }
 
+# Runs of non-alphanumeric characters, collapsed to "_" in slash commands
+_SAFE_RE = re.compile(r'[\W_]+')
+
+# Settings a run can't do without, by environment variable name
+REQUIRED_ENV = {
+    'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
+    'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
+    'GEMINI_API_KEY': GEMINI_API_KEY,
+    'G_SHEET_CREDENTIALS': SHEET_CREDENTIALS,
+}
+
 # Priority indicators
 PRIORITY_MARKERS = {
     'HIGH': '🔴',
@@ -28,71 +42,83 @@ PRIORITY_MARKERS = {
 def format_tasks(tasks, summary):
     """Format tasks into a readable Telegram message grouped by action type."""
     today = datetime.now().strftime("%Y-%m-%d")
-    lines = [f"🌿 <b>Plant Care Tasks ({today})</b>"]
+    header = [f"🌿 <b>Plant Care Tasks ({today})</b>"]
     
     if summary:
-        lines.append(f"<i>{summary}</i>")
+        header.append(f"<i>{summary}</i>")
     
-    # Group tasks by action type
+    # Single pass: group plant names by action type and build the detail lines
     by_action = {}
+    details = []
+    get_icon = ACTION_ICONS.get
+    get_marker = PRIORITY_MARKERS.get
     for t in tasks:
         action = t.get('action', 'CHECK').upper()
-        if action not in by_action:
-            by_action[action] = []
-        by_action[action].append(t)
-    
-    # Quick summary section - grouped by action
-    lines.append("")
-    for action in ['WATER', 'FERTILIZE', 'MIST', 'ROTATE', 'MOVE', 'PRUNE', 'REPOT', 'CHECK']:
-        if action in by_action:
-            icon = ACTION_ICONS.get(action, '📋')
-            plant_names = [t.get('name', '?') for t in by_action[action]]
-            lines.append(f"{icon} <b>{action}</b>: {', '.join(plant_names)}")
-    
-    # Detailed section with reasons and clickable commands
-    lines.append("\n—")
-    lines.append("<b>Details:</b>")
-    for t in tasks:
-        action = t.get('action', 'CHECK').upper()
-        icon = ACTION_ICONS.get(action, '📋')
+        icon = get_icon(action, '📋')
         name = t.get('name', 'Unknown')
         reason = t.get('reason', '')
-        priority = t.get('priority', '').upper()
-        priority_marker = PRIORITY_MARKERS.get(priority, '')
+        priority_marker = get_marker(t.get('priority', '').upper(), '')
+        by_action.setdefault(action, []).append(t.get('name', '?'))
         
         # Create clickable command (e.g. /water_monstera)
-        safe_name = "".join(c if c.isalnum() else "_" for c in name.lower())
-        safe_name = "_".join(filter(None, safe_name.split("_"))) # Remove duplicate underscores
+        safe_name = _SAFE_RE.sub('_', name.lower()).strip('_')
         command = f"/{action.lower()}_{safe_name}"
         
-        lines.append(f"{priority_marker}{icon} <b>{name}</b>: {reason}")
-        lines.append(f"   👉 Tap to log: {command}")
+        details.append(f"{priority_marker}{icon} <b>{name}</b>: {reason}")
+        details.append(f"   👉 Tap to log: {command}")
     
-    lines.append("\n<i>Reply 'Done' to confirm all at once.</i>")
+    # Quick summary section - grouped by action, in ACTION_ICONS order
+    grouped = (
+        f"{icon} <b>{action}</b>: {', '.join(by_action[action])}"
+        for action, icon in ACTION_ICONS.items() if action in by_action
+    )
     
-    return "\n".join(lines)
+    return "\n".join(chain(
+        header,
+        [""],
+        grouped,
+        ["\n—", "<b>Details:</b>"],  # Detailed section with reasons and clickable commands
+        details,
+        ["\n<i>Reply 'Done' to confirm all at once.</i>"],
+    ))
 
 
 def main():
+    # Same plain output as print(); our modules add detail at DEBUG, libraries stay quiet
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stdout)
+    logging.getLogger("src").setLevel(LOG_LEVEL)
     print(f"🌿 Starting Plant Care Advisor ({MODEL_ID})...")
 
-    # 1. Sync Mailbox (process user replies)
-    try:
-        db = PlantDB()
-        db.sync_from_mailbox()
-    except Exception as e:
-        print(f"❌ DB Init Failed: {e}")
+    # Fail fast on a misconfigured run, before paying for the heavy imports
+    missing = [name for name, value in REQUIRED_ENV.items() if not value]
+    if missing:
+        print(f"❌ Missing environment variables: {', '.join(missing)}")
         return
 
-    # 2. Get Weather Context
-    weather = get_forecast()
-    if not weather:
-        print("⚠️ Continuing without weather data...")
+    # The forecast doesn't depend on the sheet, so fetch it while the DB loads and syncs
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        weather_future = pool.submit(get_forecast)
+
+        # 1. Sync Mailbox (process user replies)
+        try:
+            # Heavy imports (pandas, gspread) are deferred until they're needed
+            from src.storage import PlantDB
+            db = PlantDB()
+            db.sync_from_mailbox()
+        except Exception as e:
+            print(f"❌ DB Init Failed: {e}")
+            return
+
+        # 2. Get Weather Context
+        weather = weather_future.result()
+        if not weather:
+            print("⚠️ Continuing without weather data...")
 
     # 3. Get Care History for context
     care_history = db.get_history_summary(limit_per_plant=5)
 
     # 4. Agent Reasoning
+    from src.agent import PlantAgent
     agent = PlantAgent()
     tasks, summary = agent.get_tasks(weather, db.get_inventory(), care_history)
 
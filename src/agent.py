@@ -1,9 +1,13 @@
-import json
-from datetime import datetime
+import time
+import functools
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from google import genai
-from google.genai import types
-from src.config import GEMINI_API_KEY, MODEL_ID
-from src.plant_api import get_care_guidelines
+from google.genai import errors, types
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from src.config import GEMINI_API_KEY, MODEL_ID, USE_BATCH_MODE, BATCH_MAX_WAIT_SECONDS
+from src.plant_api import get_care_guidelines, prefetch_care_guidelines
 
 # Predefined action types for consistency
 CARE_ACTIONS = [
@@ -29,6 +33,43 @@ MIN_ACTION_INTERVALS = {
     "CHECK": 3,       # General check every few days is fine
 }
 
+# Actions whose last occurrence only comes from CareHistory (not sheet columns)
+HISTORY_ACTIONS = frozenset(["MIST", "ROTATE", "MOVE", "PRUNE", "REPOT", "CHECK"])
+
+# Rain (mm over the last 2 days) that covers watering for outdoor plants
+RAIN_SKIP_MM = 5
+
+# Plants per prompt: small enough for the model to stay consistent across rows
+BATCH_ROWS = 15
+
+# Cap on simultaneous direct Gemini calls, to stay clear of the per-minute quota
+MAX_CONCURRENT_REQUESTS = 4
+
+# Terminal Gemini batch job states
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+# Structured output schema, so the response is always {"tasks": [...], "summary": "..."}
+TASKS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "tasks": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {"type": "STRING"},
+                    "action": {"type": "STRING", "enum": CARE_ACTIONS},
+                    "priority": {"type": "STRING", "enum": ["HIGH", "MEDIUM", "LOW"]},
+                    "reason": {"type": "STRING"},
+                },
+                "required": ["name", "action", "priority", "reason"],
+            },
+        },
+        "summary": {"type": "STRING"},
+    },
+    "required": ["tasks", "summary"],
+}
+
 SYSTEM_PROMPT = """You are an expert botanist and plant care advisor. You have deep knowledge of:
 - Tropical houseplants, succulents, cacti, herbs, and common garden plants
 - Light requirements (direct sun, bright indirect, low light, shade)
@@ -40,40 +81,257 @@ SYSTEM_PROMPT = """You are an expert botanist and plant care advisor. You have d
 Your goal is to analyze a plant inventory with calculated days_since_action for ALL action types. BE CONSERVATIVE - only recommend actions when sufficient time has passed since the last occurrence. The days_since_action field shows exactly how many days ago each action was performed (null means never)."""
 
 
-def days_since(date_str: str) -> int | None:
+@functools.lru_cache(maxsize=4096)
+def _parse_date(date_str: str) -> date | None:
+    """Parse a YYYY-MM-DD string, memoized since the same dates recur across plants and history."""
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def days_since(date_str: str, today: date | None = None) -> int | None:
     """Calculate days since a date string (YYYY-MM-DD format)."""
     if not date_str or date_str == 'N/A':
         return None
-    try:
-        past = datetime.strptime(str(date_str), '%Y-%m-%d')
-        return (datetime.now() - past).days
-    except ValueError:
+    past = _parse_date(str(date_str))
+    if past is None:
         return None
+    return ((today or date.today()) - past).days
+
+
+def _recent_rain(weather) -> float:
+    """Total precipitation (mm) for yesterday and today."""
+    if not weather:
+        return 0.0
+    return sum(p or 0 for p in weather.get('precipitation_sum', [])[-2:])
+
+
+def _needs_attention(plant: dict, recent_rain: float) -> bool:
+    """Cheap rule-based check whether a plant could need any care today.
+
+    WATER is due once the plant's minimum watering interval has passed (or it
+    was never watered), unless it's outdoors and it just rained. Other actions
+    are due once their MIN_ACTION_INTERVALS gap has passed, or if they were
+    never logged (the prompt tells the model those "may be needed").
+    """
+    days = plant["days_since_action"]
+    
+    water_days = days.get("WATER")
+    rained_on = str(plant.get("environment", "")).lower() == "outdoor" and recent_rain >= RAIN_SKIP_MM
+    if not rained_on and (water_days is None or water_days >= plant["watering_guidelines"]["min_days"]):
+        return True
+    
+    return any(
+        days.get(action) is None or days[action] >= interval
+        for action, interval in MIN_ACTION_INTERVALS.items() if action != "WATER"
+    )
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Retry malformed JSON and rate-limit/server errors, not bad requests."""
+    if isinstance(exc, orjson.JSONDecodeError):
+        return True
+    return isinstance(exc, errors.APIError) and (exc.code == 429 or exc.code >= 500)
+
+
+# Format minimum intervals for the instructions
+_INTERVALS_STR = ", ".join([f"{k}: {v}d" for k, v in MIN_ACTION_INTERVALS.items()])
+
+# Rules and output format that are the same on every run
+TASK_INSTRUCTIONS = f"""## Available Actions & Minimum Intervals
+{_INTERVALS_STR}
+
+## CRITICAL Instructions
+0. Only propose actions listed in the plant's eligible_actions.
+
+1. Check days_since_action for EACH action type before recommending:
+   - WATER: Only if days_since >= max_days in watering_guidelines
+   - FERTILIZE: Only during growing season AND if days_since >= 14
+   - MIST: Only if days_since >= 2
+   - ROTATE: Only if days_since >= 7
+   - CHECK: Only if days_since >= 3
+   - PRUNE/REPOT: Only if clearly needed AND sufficient time has passed
+
+2. Consider weather (skip watering outdoor plants if it rained)
+
+3. For null values: action has never been done, may be needed
+
+4. Assign priority based on urgency
+
+5. Skip plants that were recently cared for.
+
+## Output Format
+Return valid JSON:
+{{
+  "tasks": [
+    {{
+      "name": "PlantName",
+      "action": "ACTION_TYPE",
+      "priority": "HIGH|MEDIUM|LOW", 
+      "reason": "Brief explanation including days since last action"
+    }}
+  ],
+  "summary": "One-line overall assessment"
+}}
+
+If no actions needed, return {{"tasks": [], "summary": "All plants look healthy!"}}.
+"""
+
+# Rendered once per run; the same weather goes into every chunk's prompt
+WEATHER_CONTEXT_TEMPLATE = """
+- Recent temperatures (past 3 days + today): {temps}
+- Recent precipitation (mm): {precip}
+- Today's max temp: {today_temp}°C
+- Today's rain: {today_rain}mm
+"""
+
+# Everything static about a request, sent once as the system instruction
+INSTRUCTIONS = SYSTEM_PROMPT + "\n\n" + TASK_INSTRUCTIONS
+
+
+def _build_prompt(weather_context: str, plants: list[dict]) -> list[str]:
+    """Task prompt parts for one slice of the inventory (the static rules live in INSTRUCTIONS).
+
+    The inventory JSON is its own part rather than being spliced into a larger string.
+    """
+    return [
+        f"""Analyze this plant inventory and recommend care actions.
+
+## Weather Context
+{weather_context}
+
+## Plant Inventory
+Each plant has days_since_action showing days since each action type was performed (null = never done),
+and eligible_actions listing the only actions that may be recommended for it.""",
+        orjson.dumps(plants, option=orjson.OPT_SERIALIZE_NUMPY).decode(),
+    ]
 
 
 class PlantAgent:
     def __init__(self):
         self.client = genai.Client(api_key=GEMINI_API_KEY)
 
-    def get_tasks(self, weather, inventory_df, care_history=None):
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, max=10),
+        retry=retry_if_exception(_is_transient),
+        reraise=True,
+    )
+    def _generate(self, prompt):
+        """Single Gemini call returning the parsed JSON result (retried on transient errors)."""
+        response = self.client.models.generate_content(
+            model=MODEL_ID,
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=part) for part in prompt])],
+            config=self._request_config(),
+        )
+        return orjson.loads(response.text)
+
+    def _generate_batch(self, prompts):
+        """Run the prompts as one inline Gemini batch job and wait for it.
+
+        Returns a list of parsed JSON results, one per prompt, with None for any
+        request that failed (or for all of them if the job didn't finish within
+        BATCH_MAX_WAIT_SECONDS); the caller falls back to direct calls for those.
+        """
+        failed = [None] * len(prompts)
+        try:
+            job = self.client.batches.create(
+                model=MODEL_ID,
+                src=[{
+                    "contents": [{"role": "user", "parts": [{"text": part} for part in prompt]}],
+                    "config": self._request_config(),
+                } for prompt in prompts],
+                config={"display_name": f"shakahari-{datetime.now():%Y%m%d-%H%M}"},
+            )
+            print(f"📦 Submitted Gemini batch job {job.name} ({len(prompts)} request(s))")
+            
+            # Poll with exponential backoff
+            delay = 5
+            deadline = time.monotonic() + BATCH_MAX_WAIT_SECONDS
+            while job.state.name not in BATCH_DONE_STATES:
+                if time.monotonic() > deadline:
+                    print("⚠️ Batch job still pending, falling back to direct calls")
+                    self.client.batches.cancel(name=job.name)
+                    return failed
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+                job = self.client.batches.get(name=job.name)
+            
+            if job.state.name != "JOB_STATE_SUCCEEDED":
+                print(f"⚠️ Batch job ended with {job.state.name}, falling back to direct calls")
+                return failed
+            
+            results = []
+            for inlined in job.dest.inlined_responses:
+                if inlined.error:
+                    print(f"⚠️ Batch request error: {inlined.error}")
+                    results.append(None)
+                    continue
+                try:
+                    results.append(orjson.loads(inlined.response.text))
+                except orjson.JSONDecodeError as e:
+                    print(f"⚠️ Batch response parse error: {e}")
+                    results.append(None)
+            # Responses come back in request order; pad in case any are missing
+            return (results + failed)[:len(prompts)]
+        except Exception as e:
+            print(f"⚠️ Gemini batch error: {e}")
+            return failed
+
+    def _try_generate(self, prompt):
+        """Direct call for one prompt, logging and returning None on failure."""
+        try:
+            return self._generate(prompt)
+        except Exception as e:
+            print(f"❌ Gemini Error: {e}")
+            return None
+
+    def _generate_all(self, prompts):
+        """Results for every prompt (None where it failed).
+
+        In batch mode all prompts go into one job; anything it didn't answer is
+        retried with direct calls, at most MAX_CONCURRENT_REQUESTS at a time.
+        """
+        results = self._generate_batch(prompts) if USE_BATCH_MODE else [None] * len(prompts)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(pending))) as pool:
+                for i, result in zip(pending, pool.map(self._try_generate, [prompts[i] for i in pending])):
+                    results[i] = result
+        return results
+
+    def _request_config(self):
+        """Generation config shared by direct and batch requests."""
+        return types.GenerateContentConfig(
+            response_mime_type='application/json',
+            response_schema=TASKS_SCHEMA,
+            system_instruction=INSTRUCTIONS
+        )
+
+    def get_tasks(self, weather, inventory_rows, care_history=None):
         """Returns a list of care tasks with priorities and detailed reasoning.
         
         Args:
             weather: Weather data dict from Open-Meteo
-            inventory_df: DataFrame of plant inventory
+            inventory_rows: List of plant rows as dicts (see PlantDB.get_inventory)
             care_history: Optional dict of {plant_name: [{Date, Action}, ...]}
         """
         
         print("🌱 Building plant context with care guidelines...")
         
+        # Resolve all uncached plants at once so Gemini research is one batched call
+        prefetch_care_guidelines([row.get('Name', 'Unknown') for row in inventory_rows])
+        
         # Build inventory with all available context
+        today = date.today()  # Pinned so every plant is measured against the same day
         inventory = []
-        for _, row in inventory_df.iterrows():
+        for row in inventory_rows:
             plant_name = row.get('Name', 'Unknown')
             
             # Calculate days since last care actions from sheet columns
-            days_water = days_since(row.get('Last Watered', ''))
-            days_fert = days_since(row.get('Last Fertilized', ''))
+            days_water = days_since(row.get('Last Watered', ''), today)
+            days_fert = days_since(row.get('Last Fertilized', ''), today)
             
             # Calculate days since ALL action types from CareHistory
             days_since_action = {
@@ -81,17 +339,16 @@ class PlantAgent:
                 "FERTILIZE": days_fert,
             }
             
-            # Check CareHistory for other actions
+            # Most recent occurrence of each other action, in one pass over CareHistory
             if care_history and plant_name in care_history:
-                plant_history = care_history[plant_name]
-                for action in ['MIST', 'ROTATE', 'MOVE', 'PRUNE', 'REPOT', 'CHECK']:
-                    # Find most recent occurrence of this action
-                    for record in plant_history:
-                        if record.get('Action') == action:
-                            days = days_since(record.get('Date', ''))
-                            if days is not None:
-                                days_since_action[action] = days
-                                break
+                for record in care_history[plant_name]:
+                    action = record.get('Action')
+                    if action not in HISTORY_ACTIONS:
+                        continue
+                    days = days_since(record.get('Date', ''), today)
+                    # Smallest gap wins, so this doesn't depend on the history's sort order
+                    if days is not None and (days_since_action.get(action) is None or days < days_since_action[action]):
+                        days_since_action[action] = days
             
             # Get plant-specific care guidelines from API
             care = get_care_guidelines(plant_name)
@@ -105,109 +362,76 @@ class PlantAgent:
                     "max_days": care["max_watering_days"],
                     "frequency": care["watering"],
                 },
-                "notes": row.get('Notes', ''),
             }
             
-            # Include additional environmental fields if present
-            if 'Light' in row:
-                plant['light'] = row['Light']
-            if 'Humidity' in row:
-                plant['humidity'] = row['Humidity']
+            # Actions past their minimum interval; the model may only pick from these
+            plant["eligible_actions"] = [
+                action for action, interval in MIN_ACTION_INTERVALS.items()
+                if days_since_action.get(action) is None or days_since_action[action] >= interval
+            ]
+            
+            # Include optional fields only when filled in, to keep the prompt small
+            for column, key in (('Notes', 'notes'), ('Light', 'light'), ('Humidity', 'humidity')):
+                if row.get(column, '') not in ('', None):
+                    plant[key] = row[column]
             
             inventory.append(plant)
 
+        # Only ask Gemini about plants where some action could be due
+        recent_rain = _recent_rain(weather)
+        candidates = [p for p in inventory if _needs_attention(p, recent_rain)]
+        if not candidates:
+            print("✅ Nothing is due by the rule-based pre-check, skipping Gemini")
+            return [], "All plants look healthy!"
+        if len(candidates) < len(inventory):
+            print(f"   ⏭️ Pre-check: {len(inventory) - len(candidates)} plant(s) cared for recently, sending {len(candidates)} to Gemini")
+
         # Build weather context
         weather_context = "Unknown"
         if weather:
             temps = weather.get('temperature_2m_max', [])
             precip = weather.get('precipitation_sum', [])
-            weather_context = f"""
-            - Recent temperatures (past 3 days + today): {temps}
-            - Recent precipitation (mm): {precip}
-            - Today's max temp: {temps[-1] if temps else 'N/A'}°C
-            - Today's rain: {precip[-1] if precip else 0}mm
-            """
-
-        # Format minimum intervals for prompt
-        intervals_str = ", ".join([f"{k}: {v}d" for k, v in MIN_ACTION_INTERVALS.items()])
-
-        prompt = f"""Analyze this plant inventory and recommend care actions.
-
-## Weather Context
-{weather_context}
-
-## Plant Inventory
-Each plant has days_since_action showing days since each action type was performed (null = never done).
-{json.dumps(inventory, indent=2)}
-
-## Available Actions & Minimum Intervals
-{intervals_str}
-
-## CRITICAL Instructions
-1. Check days_since_action for EACH action type before recommending:
-   - WATER: Only if days_since >= max_days in watering_guidelines
-   - FERTILIZE: Only during growing season AND if days_since >= 14
-   - MIST: Only if days_since >= 2
-   - ROTATE: Only if days_since >= 7
-   - CHECK: Only if days_since >= 3
-   - PRUNE/REPOT: Only if clearly needed AND sufficient time has passed
-
-2. Consider weather (skip watering outdoor plants if it rained)
-
-3. For null values: action has never been done, may be needed
-
-4. Assign priority based on urgency
-
-5. Skip plants that were recently cared for.
-
-## Output Format
-Return valid JSON:
-{{
-  "tasks": [
-    {{
-      "name": "PlantName",
-      "action": "ACTION_TYPE",
-      "priority": "HIGH|MEDIUM|LOW", 
-      "reason": "Brief explanation including days since last action"
-    }}
-  ],
-  "summary": "One-line overall assessment"
-}}
-
-If no actions needed, return {{"tasks": [], "summary": "All plants look healthy!"}}.
-"""
-
-        try:
-            response = self.client.models.generate_content(
-                model=MODEL_ID,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type='application/json',
-                    system_instruction=SYSTEM_PROMPT
-                )
+            weather_context = WEATHER_CONTEXT_TEMPLATE.format(
+                temps=temps,
+                precip=precip,
+                today_temp=temps[-1] if temps else 'N/A',
+                today_rain=precip[-1] if precip else 0,
             )
-            result = json.loads(response.text)
-            tasks = result.get('tasks', [])
+
+        # Row-marshal: smaller prompts stay consistent and can run concurrently
+        chunks = [candidates[i:i + BATCH_ROWS] for i in range(0, len(candidates), BATCH_ROWS)]
+        results = self._generate_all([_build_prompt(weather_context, chunk) for chunk in chunks])
+        if not any(results):
+            return [], ""
+        
+        # Merge chunk results, dropping duplicate (plant, action) pairs
+        tasks = []
+        seen = set()
+        summaries = []
+        for result in filter(None, results):
+            for task in result.get('tasks', []):
+                key = (task.get('name'), task.get('action', '').upper())
+                if key not in seen:
+                    seen.add(key)
+                    tasks.append(task)
+            summary = result.get('summary', '')
+            if summary and summary not in summaries:
+                summaries.append(summary)
+        
+        # Post-process: the prompt restricts actions to eligible_actions, this is the safety net.
+        # Indexed over the whole inventory, so tasks naming a plant the pre-check skipped are checked too
+        by_name = {p['name']: p for p in inventory}
+        filtered_tasks = []
+        for task in tasks:
+            action = task.get('action', '').upper()
+            plant_name = task.get('name')
+            plant_data = by_name.get(plant_name)
             
-            # Post-process: Filter out actions that are too soon based on MIN_ACTION_INTERVALS
-            filtered_tasks = []
-            for task in tasks:
-                action = task.get('action', '').upper()
-                plant_name = task.get('name')
-                
-                # Check minimum interval for this action
-                min_interval = MIN_ACTION_INTERVALS.get(action, 0)
-                plant_data = next((p for p in inventory if p['name'] == plant_name), None)
-                
-                if plant_data and min_interval > 0:
-                    days = plant_data.get('days_since_action', {}).get(action)
-                    if days is not None and days < min_interval:
-                        print(f"   ⏭️ Filtered {action} for {plant_name} (only {days} days, min={min_interval})")
-                        continue
-                
-                filtered_tasks.append(task)
+            if plant_data and action not in plant_data['eligible_actions']:
+                days = plant_data['days_since_action'].get(action)
+                print(f"   ⏭️ Filtered {action} for {plant_name} (only {days} days, min={MIN_ACTION_INTERVALS.get(action)})")
+                continue
             
-            return filtered_tasks, result.get('summary', '')
-        except Exception as e:
-            print(f"❌ Gemini Error: {e}")
-            return [], ""
\ No newline at end of file
+            filtered_tasks.append(task)
+        
+        return filtered_tasks, " ".join(summaries)
@@ -0,0 +1,70 @@
+"""
+Small persistent key/value cache for API responses.
+
+Everything lives in one JSON file under data/, each entry stamped with the
+time it was stored so readers can apply their own TTL.
+"""
+import threading
+import time
+import orjson
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).parent.parent / "data" / "cache.json"
+
+# Entries older than this are dropped on write, whatever their readers' TTL
+MAX_AGE_DAYS = 7
+
+# In-memory copy (loaded from file on first use)
+_entries = None
+
+# Weather is fetched on a background thread while the sheet loads, both use the cache
+_lock = threading.Lock()
+
+
+def _load():
+    """Load the cache file once per session."""
+    global _entries
+    if _entries is not None:
+        return _entries
+    _entries = {}
+    if CACHE_FILE.exists():
+        try:
+            with open(CACHE_FILE, 'rb') as f:
+                _entries = orjson.loads(f.read())
+        except Exception as e:
+            print(f"⚠️ Cache load error: {e}")
+    return _entries
+
+
+def cache_get(key: str, ttl_seconds: float | None = None):
+    """Returns the cached value for key, or None if missing or older than ttl_seconds.
+
+    With ttl_seconds=None any stored value is returned, however old.
+    """
+    with _lock:
+        entry = _load().get(key)
+    if not entry:
+        return None
+    if ttl_seconds is not None and entry.get('ts', 0) < time.time() - ttl_seconds:
+        return None
+    return entry.get('value')
+
+
+def cache_put(key: str, value):
+    """Store a value under key and write the cache to disk."""
+    with _lock:
+        entries = _load()
+        now = time.time()
+        entries[key] = {"ts": now, "value": value}
+
+        # Prune old entries so date-keyed values don't pile up
+        cutoff = now - MAX_AGE_DAYS * 86400
+        for stale in [k for k, entry in entries.items() if entry.get('ts', 0) < cutoff]:
+            del entries[stale]
+
+        try:
+            CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(CACHE_FILE, 'wb') as f:
+                f.write(orjson.dumps(entries))
+        except Exception as e:
+            print(f"⚠️ Cache save error: {e}")
@@ -16,4 +16,9 @@ MODEL_ID = "gemini-2.5-flash"
 LATITUDE = 34.05 
 LONGITUDE = -118.25
 SHEET_NAME = "ShakahariDB"
-WORKSHEET_NAME = "Plants"
\ No newline at end of file
+WORKSHEET_NAME = "Plants"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Gemini Batch Mode: ~50% cheaper, but jobs are queued. Off by default so ad-hoc runs stay fast.
+USE_BATCH_MODE = os.environ.get("USE_BATCH_MODE", "").lower() in ("1", "true", "yes")
+BATCH_MAX_WAIT_SECONDS = 30 * 60  # Fall back to a direct call if the job isn't done by then
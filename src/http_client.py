@@ -0,0 +1,17 @@
+"""
+Shared HTTP session for Open-Meteo, Telegram and Perenual calls.
+
+Reusing one requests.Session keeps connections alive between calls instead
+of paying a fresh TCP + TLS handshake for every request.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Retries cover connection errors on idempotent methods only (not POST)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
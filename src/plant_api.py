@@ -4,12 +4,18 @@ https://perenual.com/docs/api
 
 Includes file-based caching to avoid rate limits.
 """
-import json
-import requests
+import os
 import time
+import atexit
+import orjson
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from google import genai
-from google.genai import types
+from google.genai import errors, types
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+from src.http_client import SESSION
 from src.config import PERENUAL_API_KEY, GEMINI_API_KEY, MODEL_ID
 
 BASE_URL = "https://perenual.com/api/v2"
@@ -24,15 +30,55 @@ DEFAULT_CARE = {
     "sunlight": ["Indirect"],
 }
 
+# Response format and rules shared by the single and batched Gemini lookups
+CARE_FORMAT = """{
+      "watering": "Frequent|Average|Minimum",
+      "watering_period": "brief description like 7-10 days",
+      "min_watering_days": integer,
+      "max_watering_days": integer,
+      "sunlight": ["List", "of", "light", "needs"],
+      "common_name": "Standard Common Name"
+    }"""
+
+CARE_RULES = """Rules:
+    - Frequent: 2-4 days
+    - Average: 5-10 days
+    - Minimum: 14-21 days
+    - Sunlight should be a list like ["Full sun", "Part shade"]"""
+
+# Concurrent per-plant Gemini lookups when the batched prompt can't answer everything
+GEMINI_MAX_WORKERS = 8
+
+# Concurrent Perenual lookups; request starts are still spaced PERENUAL_MIN_INTERVAL apart
+PERENUAL_MAX_WORKERS = 4
+PERENUAL_MIN_INTERVAL = 1.5  # seconds, to avoid burst limits
+
+# Cached lookups are refreshed after this long; Default fallbacks are retried sooner
+CACHE_TTL_DAYS = 30
+DEFAULT_CACHE_TTL_DAYS = 1
+
 # In-memory cache (loaded from file on startup)
 _cache = {}
 _cache_loaded = False
+_cache_dirty = False  # Written once at exit, only if something changed
 
 # Circuit breaker flag to skip API calls after a 429 error in the current session
 _circuit_broken = False
 
-# Initialize Gemini Client for fallback lookups
-_ai_client = genai.Client(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None
+# Shared across lookup threads so the request spacing holds globally
+_throttle_lock = threading.Lock()
+_next_request_at = 0.0
+
+# Gemini Client for fallback lookups, created on first use
+_ai_client = None
+
+
+def _get_ai_client():
+    """Returns the Gemini client, or None if no API key is configured."""
+    global _ai_client
+    if _ai_client is None and GEMINI_API_KEY:
+        _ai_client = genai.Client(api_key=GEMINI_API_KEY)
+    return _ai_client
 
 
 def _load_cache():
@@ -41,11 +87,12 @@ def _load_cache():
     if _cache_loaded:
         return
     _cache_loaded = True
+    atexit.register(_save_cache)
     
     if CACHE_FILE.exists():
         try:
-            with open(CACHE_FILE, 'r') as f:
-                _cache = json.load(f)
+            with open(CACHE_FILE, 'rb') as f:
+                _cache = orjson.loads(f.read())
             if _cache:
                 print(f"📂 Loaded {len(_cache)} plants from cache")
         except Exception as e:
@@ -54,71 +101,169 @@ def _load_cache():
 
 
 def _save_cache():
-    """Save cache to disk."""
+    """Save cache to disk if it changed (atomically, via a temp file)."""
+    global _cache_dirty
+    if not _cache_dirty:
+        return
     try:
         CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(_cache, f, indent=2)
+        tmp = CACHE_FILE.with_suffix('.tmp')
+        # Indented so the committed seed file stays readable in diffs
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(_cache, option=orjson.OPT_INDENT_2))
+        os.replace(tmp, CACHE_FILE)
+        _cache_dirty = False
     except Exception as e:
         print(f"⚠️ Cache save error: {e}")
 
 
+def _throttle():
+    """Block until PERENUAL_MIN_INTERVAL has passed since the previous request started."""
+    global _next_request_at
+    with _throttle_lock:
+        now = time.monotonic()
+        wait = _next_request_at - now
+        _next_request_at = max(now, _next_request_at) + PERENUAL_MIN_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _is_cached(cache_key: str) -> bool:
+    """True if the plant has a cache entry that hasn't expired.
+
+    Entries without a _cached_at timestamp (e.g. the committed seed data) never expire.
+    """
+    entry = _cache.get(cache_key)
+    if not entry:
+        return False
+    cached_at = entry.get("_cached_at")
+    if cached_at is None:
+        return True
+    ttl_days = DEFAULT_CACHE_TTL_DAYS if entry.get("_source") == "Default" else CACHE_TTL_DAYS
+    return cached_at > time.time() - ttl_days * 86400
+
+
+def _is_transient_http(exc: BaseException) -> bool:
+    """5xx responses are worth retrying; 4xx are not.
+
+    Connection errors and timeouts are left to the shared session's own retries
+    (src/http_client.py), so the two don't multiply against a hung server.
+    """
+    return isinstance(exc, requests.HTTPError) and exc.response is not None and exc.response.status_code >= 500
+
+
+def _is_transient_gemini(exc: BaseException) -> bool:
+    """Rate-limit and server errors from Gemini are worth retrying."""
+    return isinstance(exc, errors.APIError) and (exc.code == 429 or exc.code >= 500)
+
+
+@retry(
+    stop=stop_after_attempt(4),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    retry=retry_if_exception(_is_transient_http),
+    reraise=True,
+)
+def _perenual_get(path: str, params: dict):
+    """GET a Perenual endpoint, rate limited by _throttle and retried on server errors.
+
+    4xx responses (including 429) are returned for the caller to handle.
+    """
+    _throttle()
+    response = SESSION.get(f"{BASE_URL}/{path}", params={"key": PERENUAL_API_KEY, **params}, timeout=10)
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+@retry(
+    stop=stop_after_attempt(4),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    retry=retry_if_exception(_is_transient_gemini),
+    reraise=True,
+)
+def _grounded_generate(prompt: str) -> str:
+    """Google Search grounded Gemini call returning the raw text (retried on transient errors)."""
+    response = _get_ai_client().models.generate_content(
+        model=MODEL_ID,
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            tools=[types.Tool(google_search=types.GoogleSearch())],
+        )
+    )
+    return response.text
+
+
+def _extract_json(text: str):
+    """Pull the JSON payload out of a (possibly markdown-fenced) model response."""
+    # Grounding doesn't support mime_type='application/json', so strip fences manually
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0].strip()
+    return orjson.loads(text)
+
+
 def _get_gemini_care(plant_name: str) -> dict | None:
     """Use Gemini to fetch plant care data when API is restricted."""
-    if not _ai_client:
+    client = _get_ai_client()
+    if not client:
         return None
         
     prompt = f"""Provide scientific plant care guidelines for '{plant_name}'.
     Return ONLY valid JSON in this exact format:
-    {{
-      "watering": "Frequent|Average|Minimum",
-      "watering_period": "brief description like 7-10 days",
-      "min_watering_days": integer,
-      "max_watering_days": integer,
-      "sunlight": ["List", "of", "light", "needs"],
-      "common_name": "Standard Common Name"
-    }}
-    Rules: 
-    - Frequent: 2-4 days
-    - Average: 5-10 days
-    - Minimum: 14-21 days
-    - Sunlight should be a list like ["Full sun", "Part shade"]
+    {CARE_FORMAT}
+    {CARE_RULES}
     """
     
     try:
-        response = _ai_client.models.generate_content(
-            model=MODEL_ID,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-            )
-        )
-        # Manually extract JSON from response text as grounding doesn't support mime_type='application/json'
-        text = response.text
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-            
-        return json.loads(text)
+        return _extract_json(_grounded_generate(prompt))
     except Exception as e:
         print(f"⚠️ Gemini fallback error for '{plant_name}': {e}")
         return None
 
 
+def _get_gemini_care_batch(plant_names: list[str]) -> dict:
+    """Use a single Gemini prompt to fetch care data for several plants.
+
+    Returns a dict of {lowercased plant name: care}; plants the model
+    didn't answer for are simply missing.
+    """
+    client = _get_ai_client()
+    if not client or not plant_names:
+        return {}
+
+    prompt = f"""Provide scientific plant care guidelines for each of these plants:
+    {orjson.dumps(plant_names).decode()}
+    Return ONLY a valid JSON object keyed by the plant name exactly as given above,
+    where each value is in this exact format:
+    {CARE_FORMAT}
+    {CARE_RULES}
+    """
+
+    try:
+        result = _extract_json(_grounded_generate(prompt))
+    except Exception as e:
+        print(f"⚠️ Gemini batch fallback error: {e}")
+        return {}
+
+    if not isinstance(result, dict):
+        return {}
+    return {name.lower().strip(): care for name, care in result.items() if _is_valid_care(care)}
+
+
+def _is_valid_care(care) -> bool:
+    """Check a model-produced care entry has the fields we rely on."""
+    return isinstance(care, dict) and "min_watering_days" in care and "max_watering_days" in care
+
+
 def search_plant(name: str) -> dict | None:
     """Search for a plant by name and return first match."""
     global _circuit_broken
     if not PERENUAL_API_KEY or _circuit_broken:
         return None
     
-    # Sequential delay to avoid burst limits
-    time.sleep(1.5)
-    
     try:
-        url = f"{BASE_URL}/species-list"
-        params = {"key": PERENUAL_API_KEY, "q": name}
-        response = requests.get(url, params=params, timeout=10)
+        response = _perenual_get("species-list", {"q": name})
         
         if response.status_code == 429:
             # Differentiate between real rate limit and plan block
@@ -131,7 +276,7 @@ def search_plant(name: str) -> dict | None:
                 return None
             
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         if data.get("data"):
             return data["data"][0]
@@ -147,13 +292,8 @@ def get_plant_details(plant_id: int) -> dict | None:
     if not PERENUAL_API_KEY or _circuit_broken:
         return None
     
-    # Sequential delay to avoid burst limits
-    time.sleep(1.5)
-    
     try:
-        url = f"{BASE_URL}/species/details/{plant_id}"
-        params = {"key": PERENUAL_API_KEY}
-        response = requests.get(url, params=params, timeout=10)
+        response = _perenual_get(f"species/details/{plant_id}", {})
         
         if response.status_code == 429:
             # Differentiate between real rate limit and plan block
@@ -166,12 +306,111 @@ def get_plant_details(plant_id: int) -> dict | None:
                 return None
             
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         print(f"⚠️ Perenual details error: {e}")
         return None
 
 
+def _get_perenual_care(plant_name: str) -> dict | None:
+    """Look a plant up on Perenual and map its details to our care format."""
+    cache_key = plant_name.lower().strip()
+    result = search_plant(cache_key) if not _circuit_broken else None
+    details = None
+    
+    if result:
+        plant_id = result.get("id")
+        details = get_plant_details(plant_id) if plant_id else None
+    
+    if not details:
+        return None
+
+    watering = details.get("watering", "Average")
+    watering_period = details.get("watering_general_benchmark", {})
+    
+    watering_map = {
+        "Frequent": {"min": 2, "max": 4},
+        "Average": {"min": 5, "max": 10},
+        "Minimum": {"min": 14, "max": 21},
+        "None": {"min": 30, "max": 60},
+    }
+    days = watering_map.get(watering, {"min": 5, "max": 10})
+    
+    return {
+        "watering": watering,
+        "watering_period": watering_period.get("value", "weekly") if isinstance(watering_period, dict) else "weekly",
+        "min_watering_days": days["min"],
+        "max_watering_days": days["max"],
+        "sunlight": details.get("sunlight", ["Indirect"]),
+        "common_name": details.get("common_name", plant_name),
+        "_source": "Perenual API"
+    }
+
+
+def _store(plant_name: str, care: dict | None) -> dict:
+    """Put a freshly looked-up entry in the in-memory cache (Default if lookup failed)."""
+    global _cache_dirty
+    if not care:
+        # Absolute fallback
+        care = DEFAULT_CARE.copy()
+        care["_source"] = "Default"
+    
+    care["_cached_at"] = int(time.time())
+    _cache[plant_name.lower().strip()] = care
+    _cache_dirty = True
+    print(f"   📖 {plant_name}: water every {care['min_watering_days']}-{care['max_watering_days']} days ({care['_source']}) [cached]")
+    return care
+
+
+def prefetch_care_guidelines(plant_names: list[str]):
+    """
+    Resolve care guidelines for every uncached plant up front.
+    Perenual is queried per plant (concurrently), and everything it can't answer is
+    researched with one batched Gemini prompt instead of one call per plant.
+    """
+    _load_cache()
+    
+    # Unique uncached plants, keeping the first spelling seen
+    missing = {}
+    for name in plant_names:
+        cache_key = str(name).lower().strip()
+        if cache_key and not _is_cached(cache_key) and cache_key not in missing:
+            missing[cache_key] = str(name)
+    
+    if not missing:
+        return
+    
+    # Perenual lookups overlap their round-trips; _throttle keeps the request rate down
+    names = list(missing.values())
+    unresolved = []
+    with ThreadPoolExecutor(max_workers=min(PERENUAL_MAX_WORKERS, len(names))) as pool:
+        for plant_name, care in zip(names, pool.map(_get_perenual_care, names)):
+            if care:
+                _store(plant_name, care)
+            else:
+                unresolved.append(plant_name)
+    
+    if unresolved:
+        print(f"   ✨ Researching {len(unresolved)} plant(s) using Gemini AI (Grounded)...")
+        researched = _get_gemini_care_batch(unresolved)
+        
+        # Research anything the batch failed on individually, in parallel (network-bound)
+        leftovers = [name for name in unresolved if name.lower().strip() not in researched]
+        if leftovers:
+            with ThreadPoolExecutor(max_workers=min(GEMINI_MAX_WORKERS, len(leftovers))) as pool:
+                for plant_name, care in zip(leftovers, pool.map(_get_gemini_care, leftovers)):
+                    if _is_valid_care(care):
+                        researched[plant_name.lower().strip()] = care
+        
+        for plant_name in unresolved:
+            care = researched.get(plant_name.lower().strip())
+            if care:
+                care["_source"] = "Gemini AI (Grounded)"
+            _store(plant_name, care)
+    
+    _save_cache()
+
+
 def get_care_guidelines(plant_name: str) -> dict:
     """
     Get care guidelines for a plant by name.
@@ -183,59 +422,23 @@ def get_care_guidelines(plant_name: str) -> dict:
     cache_key = plant_name.lower().strip()
     
     # Check cache first
-    if cache_key in _cache:
+    if _is_cached(cache_key):
         cached = _cache[cache_key]
         source = cached.get("_source", "cache")
         print(f"   📖 {plant_name}: water every {cached['min_watering_days']}-{cached['max_watering_days']} days ({source})")
         return cached
     
     # Not in cache - try Perenual API first
-    result = search_plant(cache_key) if not _circuit_broken else None
-    details = None
+    care = _get_perenual_care(plant_name)
     
-    if result:
-        plant_id = result.get("id")
-        details = get_plant_details(plant_id) if plant_id else None
-    
-    if details:
-        # Success from Perenual
-        watering = details.get("watering", "Average")
-        watering_period = details.get("watering_general_benchmark", {})
-        
-        watering_map = {
-            "Frequent": {"min": 2, "max": 4},
-            "Average": {"min": 5, "max": 10},
-            "Minimum": {"min": 14, "max": 21},
-            "None": {"min": 30, "max": 60},
-        }
-        days = watering_map.get(watering, {"min": 5, "max": 10})
-        
-        care = {
-            "watering": watering,
-            "watering_period": watering_period.get("value", "weekly") if isinstance(watering_period, dict) else "weekly",
-            "min_watering_days": days["min"],
-            "max_watering_days": days["max"],
-            "sunlight": details.get("sunlight", ["Indirect"]),
-            "common_name": details.get("common_name", plant_name),
-            "_source": "Perenual API"
-        }
-    else:
+    if not care:
         # Fallback to Gemini AI
         print(f"   ✨ Researching '{plant_name}' using Gemini AI (Grounded)...")
         care = _get_gemini_care(plant_name)
-        if care:
+        if _is_valid_care(care):
             care["_source"] = "Gemini AI (Grounded)"
         else:
-            # Absolute fallback
-            care = DEFAULT_CARE.copy()
-            care["_source"] = "Default"
-    
-    # Cache and save
-    _cache[cache_key] = care
-    _save_cache()
+            care = None
     
-    print(f"   📖 {plant_name}: water every {care['min_watering_days']}-{care['max_watering_days']} days ({care['_source']}) [saved to cache]")
-    return care
-
-
-
+    # Cached in memory, written to disk at exit
+    return _store(plant_name, care)
@@ -1,10 +1,21 @@
-import json
+import re
+import logging
+import orjson
+import functools
 from datetime import datetime
 import pandas as pd
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.utils import rowcol_to_a1
+from rapidfuzz import fuzz, process
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+from src.cache import cache_get, cache_put
+from src.telegram_bot import confirm_messages, get_recent_messages
 from src.config import SHEET_CREDENTIALS, SHEET_NAME, WORKSHEET_NAME
 
+# Per-part reply parsing details are debug-level; set LOG_LEVEL=DEBUG to see them
+log = logging.getLogger(__name__)
+
 # Action keywords for parsing user replies
 ACTION_KEYWORDS = {
     'watered': 'WATER',
@@ -18,99 +29,286 @@ ACTION_KEYWORDS = {
     'checked': 'CHECK',
 }
 
+# Actions accepted in slash commands: action names plus upper-cased keywords (e.g. /watered_fern)
+_VALID_ACTIONS = frozenset(ACTION_KEYWORDS.values()) | {k.upper() for k in ACTION_KEYWORDS} | {
+    'WATER', 'FERTILIZE', 'MIST', 'ROTATE', 'MOVE', 'PRUNE', 'REPOT', 'CHECK',
+}
+
+# Any action keyword as a whole word, one regex search instead of a scan per keyword
+_KW_RE = re.compile(r'\b(' + '|'.join(map(re.escape, ACTION_KEYWORDS)) + r')\b')
+
+# Separators between the parts of a compound reply, e.g. "watered monstera and fern"
+_SPLIT_RE = re.compile(r'[,;]|\band\b')
+
+# What to look for in a PENDING_... status to confirm each action on "done"
+DONE_STATUS_TOKENS = {
+    'WATER': 'WATER',
+    'FERTILIZE': 'FERT',
+    'MIST': 'MIST',
+    'ROTATE': 'ROTATE',
+    'MOVE': 'MOVE',
+    'PRUNE': 'PRUNE',
+    'REPOT': 'REPOT',
+    'CHECK': 'CHECK',
+}
+
+# Sheet columns holding the last date of an action
+DATE_COLUMNS = {
+    'WATER': 'Last Watered',
+    'FERTILIZE': 'Last Fertilized',
+}
+
+# Minimum rapidfuzz ratio score for a typo'd plant name to count as a match. Whole-name
+# ratio, not partial_ratio: partial scores let "watered all" land on "aloe vera"
+FUZZY_CUTOFF = 75
+# Shorter queries are too ambiguous to fuzzy match
+FUZZY_MIN_LENGTH = 4
+
 HISTORY_WORKSHEET = "CareHistory"
 HISTORY_HEADERS = ["Date", "Plant", "Action", "Notes"]
 
+SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+
+@functools.lru_cache(maxsize=1)
+def _sheet_client():
+    """Authorized gspread client, created once per process."""
+    try:
+        creds_dict = orjson.loads(SHEET_CREDENTIALS)
+    except orjson.JSONDecodeError as e:
+        raise Exception(f"Invalid G_SHEET_CREDENTIALS JSON: {e}")
+    
+    creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPE)
+    _apply_cached_token(creds)
+    return gspread.authorize(creds)
+
+
+def _apply_cached_token(creds):
+    """Reuse the access token from a previous run while it's valid, else fetch and cache one.
+
+    Saves signing a fresh JWT and a round-trip to the OAuth token endpoint on every run.
+    """
+    key = f"sheets_token:{creds.service_account_email}"
+    cached = cache_get(key)
+    if cached:
+        creds.token = cached['token']
+        creds.expiry = datetime.fromisoformat(cached['expiry'])
+        # google-auth's own check, which already leaves a margin before the real expiry
+        if not creds.expired:
+            return
+    
+    try:
+        creds.refresh(Request())
+        cache_put(key, {"token": creds.token, "expiry": creds.expiry.isoformat()})
+    except Exception as e:
+        # gspread will refresh on the first request instead
+        print(f"⚠️ Token refresh error: {e}")
+
+
+@functools.lru_cache(maxsize=1)
+def _spreadsheet():
+    """The ShakahariDB spreadsheet handle, opened once per process."""
+    try:
+        return _sheet_client().open(SHEET_NAME)
+    except gspread.SpreadsheetNotFound:
+        raise Exception(f"Spreadsheet '{SHEET_NAME}' not found. Did you share it with the service account?")
+
+
+def _batch_get_values(spreadsheet, titles):
+    """Fetch whole worksheets by title in one request, as lists of equal-length rows."""
+    # A bare sheet name is the whole sheet; quotes inside it are doubled in A1 notation
+    ranges = ["'{}'".format(title.replace("'", "''")) for title in titles]
+    response = spreadsheet.values_batch_get(ranges)
+    result = []
+    for value_range in response.get('valueRanges', []):
+        rows = value_range.get('values', [])
+        # The API trims trailing empty cells, pad like get_all_values() does
+        width = max((len(row) for row in rows), default=0)
+        result.append([row + [''] * (width - len(row)) for row in rows])
+    return result
+
+
+def _cell_data(value):
+    """CellData for a raw value, stored as-is like valueInputOption RAW."""
+    if value is None or pd.isna(value):
+        return {'userEnteredValue': {'stringValue': ''}}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+def _values_to_df(values):
+    """Builds a DataFrame from raw sheet values (first row is the header)."""
+    if not values:
+        return pd.DataFrame()
+    return pd.DataFrame(values[1:], columns=values[0])
+
+
+def _safe_name(name):
+    """Slash-command form of a plant name, e.g. 'Peace Lily' -> 'peace_lily'."""
+    safe_name = "".join(c if c.isalnum() else "_" for c in name.lower())
+    return "_".join(filter(None, safe_name.split("_")))
+
 
 class PlantDB:
     def __init__(self):
-        try:
-            creds_dict = json.loads(SHEET_CREDENTIALS)
-        except json.JSONDecodeError as e:
-            raise Exception(f"Invalid G_SHEET_CREDENTIALS JSON: {e}")
+        self.spreadsheet = _spreadsheet()
         
-        scope = ['https://spreadsheets.google.com/feeds','https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        
-        try:
-            self.spreadsheet = client.open(SHEET_NAME)
-        except gspread.SpreadsheetNotFound:
-            raise Exception(f"Spreadsheet '{SHEET_NAME}' not found. Did you share it with the service account?")
+        # Resolve both worksheet handles from one metadata request
+        worksheets = {ws.title: ws for ws in self.spreadsheet.worksheets()}
         
         # Main Plants worksheet
-        try:
-            self.worksheet = self.spreadsheet.worksheet(WORKSHEET_NAME)
-        except gspread.WorksheetNotFound:
+        self.worksheet = worksheets.get(WORKSHEET_NAME)
+        if self.worksheet is None:
             raise Exception(f"Worksheet '{WORKSHEET_NAME}' not found in '{SHEET_NAME}'")
         
-        self.df = pd.DataFrame(self.worksheet.get_all_records())
-        
-        # CareHistory worksheet (create if missing, add headers if empty)
-        try:
-            self.history_ws = self.spreadsheet.worksheet(HISTORY_WORKSHEET)
-            # Check if headers exist, add if empty
-            if not self.history_ws.get_all_values():
-                print(f"📝 Adding headers to '{HISTORY_WORKSHEET}'...")
-                self.history_ws.append_row(HISTORY_HEADERS)
-        except gspread.WorksheetNotFound:
+        # CareHistory worksheet (create if missing)
+        self.history_ws = worksheets.get(HISTORY_WORKSHEET)
+        if self.history_ws is None:
             print(f"📝 Creating '{HISTORY_WORKSHEET}' worksheet...")
             self.history_ws = self.spreadsheet.add_worksheet(
                 title=HISTORY_WORKSHEET, rows=1000, cols=4
             )
+        
+        # Both worksheets' values in a single batchGet request
+        plant_values, history_values = _batch_get_values(
+            self.spreadsheet, [self.worksheet.title, self.history_ws.title]
+        )
+        
+        # Raw values skip get_all_records' per-row dict construction
+        self.df = _values_to_df(plant_values)
+        # Column order as it is in the sheet, and cells changed since the last save
+        self._sheet_columns = self.df.columns.tolist()
+        self._dirty = set()
+        self._refresh_name_index()
+        # History rows logged but not yet appended to the sheet (see flush_history)
+        self._history_buffer = []
+        self._buffering_history = False  # Set while sync_from_mailbox runs
+        
+        # Add headers to an empty history sheet
+        if not history_values:
+            print(f"📝 Adding headers to '{HISTORY_WORKSHEET}'...")
             self.history_ws.append_row(HISTORY_HEADERS)
+            history_values = [HISTORY_HEADERS]
+        
+        # Raw history rows, kept in step with log_action so reads need no API call
+        self._history_header = history_values[0]
+        self._history = history_values[1:]
+        self._history_cache = None  # DataFrame of self._history, built on first read
+
+    def _refresh_name_index(self):
+        """Rebuild the plant-name lookups (call again if rows are added or renamed)."""
+        names = self.df.get('Name', pd.Series(dtype=object))
+        # Row labels by exact plant name, so task lookups don't scan the Name column
+        self._name_to_idx = {}
+        for label, name in names.items():
+            self._name_to_idx.setdefault(name, []).append(label)
+        # Lowercased and slash-command-safe forms for matching replies
+        self._names_lower = names.astype(str).str.lower()
+        self._safe_names = self._names_lower.map(_safe_name)
 
     def get_inventory(self):
-        """Returns the full plant inventory DataFrame."""
-        return self.df
+        """Returns the full plant inventory as a list of row dicts."""
+        return self.df.to_dict('records')
+
+    def _history_df(self):
+        """History as a DataFrame, newest first, built once and kept sorted by log_action.
+
+        Has an extra _date column with Date parsed once to datetime64, for ordering;
+        the Date strings themselves are what callers get back. Rows whose date
+        can't be parsed are left out.
+        """
+        if self._history_cache is None:
+            df = pd.DataFrame(self._history, columns=self._history_header)
+            df['_date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce')
+            # Reversed first so that on equal dates the later-logged row comes first
+            df = df.iloc[::-1].dropna(subset=['_date'])
+            self._history_cache = df.sort_values('_date', ascending=False, kind='stable').reset_index(drop=True)
+        return self._history_cache
+
+    def _add_to_history_cache(self, row):
+        """Keep the sorted history frame warm: prepend rows that are the newest, else rebuild later."""
+        if self._history_cache is None:
+            return
+        new = pd.DataFrame([row], columns=self._history_header)
+        new['_date'] = pd.to_datetime(new['Date'], format='%Y-%m-%d', errors='coerce')
+        if new['_date'].isna().all():
+            return  # Unparseable dates aren't in the frame anyway
+        if self._history_cache.empty or new['_date'].iloc[0] >= self._history_cache['_date'].iloc[0]:
+            self._history_cache = pd.concat([new, self._history_cache], ignore_index=True)
+        else:
+            self._history_cache = None  # Backdated entry, re-sort on the next read
 
     def get_recent_history(self, plant_name=None, limit=5):
         """Fetch recent care history for a plant or all plants."""
-        records = self.history_ws.get_all_records()
-        if not records:
+        df = self._history_df()
+        if df.empty:
             return []
         
-        df = pd.DataFrame(records)
-        
         if plant_name:
             df = df[df['Plant'].str.lower() == plant_name.lower()]
         
-        # Sort by date descending and limit
-        df = df.sort_values('Date', ascending=False).head(limit)
-        return df.to_dict('records')
+        # Already sorted newest first
+        return df.head(limit).drop(columns='_date').to_dict('records')
 
     def get_history_summary(self, limit_per_plant=3):
         """Get recent care summary for all plants (for agent context)."""
-        records = self.history_ws.get_all_records()
-        if not records:
+        df = self._history_df()
+        if df.empty:
             return {}
         
-        df = pd.DataFrame(records)
-        summary = {}
-        
-        for plant in self.df['Name'].unique():
-            plant_history = df[df['Plant'] == plant].sort_values('Date', ascending=False).head(limit_per_plant)
-            if not plant_history.empty:
-                summary[plant] = plant_history[['Date', 'Action']].to_dict('records')
+        # Already sorted newest first, so one groupby pass picks each plant's latest rows
+        known = df[df['Plant'].isin(list(self._name_to_idx))]
+        recent = known.groupby('Plant', sort=False).head(limit_per_plant)
         
-        return summary
+        return {
+            plant: rows[['Date', 'Action']].to_dict('records')
+            for plant, rows in recent.groupby('Plant', sort=False)
+        }
 
     def log_action(self, plant_name, action, date=None, notes=""):
-        """Log a care action to history."""
+        """Log a care action to history.
+
+        During sync_from_mailbox rows are buffered until its closing flush(); otherwise
+        they're written straight away.
+        """
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
-        self.history_ws.append_row([date, plant_name, action, notes])
+        row = [date, plant_name, action, notes]
+        self._history_buffer.append(row)
+        self._history.append(row)
+        self._add_to_history_cache(row)
+        if not self._buffering_history:
+            self.flush_history()
+
+    def flush_history(self):
+        """Appends all buffered history rows to the sheet in one request."""
+        if not self._history_buffer:
+            return
+        self.history_ws.append_rows(self._history_buffer, value_input_option='RAW')
+        print(f"📝 Logged {len(self._history_buffer)} action(s) to {HISTORY_WORKSHEET}")
+        self._history_buffer = []
 
     def sync_from_mailbox(self):
         """Updates DB based on user replies - handles all action types."""
-        from src.telegram_bot import get_recent_messages
-        messages = get_recent_messages()
+        messages, next_offset = get_recent_messages()
         
         print(f"📬 Checking mailbox... found {len(messages) if messages else 0} messages")
         
         if not messages:
+            # Nothing to apply (e.g. only non-text updates), safe to move past them
+            confirm_messages(next_offset)
             return False
 
+        # Buffer history rows for the whole sync, they go out in one append at the end
+        self._buffering_history = True
+
+        # Lowercased and slash-command-safe plant names, computed at load time
+        names_lower = self._names_lower
+        safe_names = self._safe_names
+        
         changes = False
         for msg in messages:
             raw_text = msg['text']
@@ -121,22 +319,19 @@ class PlantDB:
 
             # CASE 1: "DONE" - Clears all pending statuses
             if text in ['done', 'done all', 'completed']:
-                mask_pending = self.df['Status'].str.startswith('PENDING', na=False)
-                for idx, row in self.df[mask_pending].iterrows():
-                    status = row['Status']
-                    plant_name = row['Name']
-                    
-                    if 'WATER' in status:
-                        self.df.at[idx, 'Last Watered'] = date
-                        self.log_action(plant_name, 'WATER', date=date, notes='Confirmed via Done')
-                    if 'FERT' in status:
-                        self.df.at[idx, 'Last Fertilized'] = date
-                        self.log_action(plant_name, 'FERTILIZE', date=date, notes='Confirmed via Done')
-                    for action in ['MIST', 'ROTATE', 'MOVE', 'PRUNE', 'REPOT', 'CHECK']:
-                        if action in status:
+                statuses = self.df['Status'].fillna('').astype(str)
+                pending = statuses.str.startswith('PENDING')
+                if pending.any():
+                    for action, token in DONE_STATUS_TOKENS.items():
+                        done = pending & statuses.str.contains(token, regex=False)
+                        if not done.any():
+                            continue
+                        if action in DATE_COLUMNS:
+                            self._set(done, DATE_COLUMNS[action], date)
+                        for plant_name in self.df.loc[done, 'Name']:
                             self.log_action(plant_name, action, date=date, notes='Confirmed via Done')
                     
-                    self.df.at[idx, 'Status'] = 'OK'
+                    self._set(pending, 'Status', 'OK')
                     changes = True
                 
                 if changes:
@@ -149,16 +344,15 @@ class PlantDB:
                 last_action = None
                 
                 # Split on comma, semicolon, or "and" for compound messages
-                import re
-                parts = re.split(r'[,;]|\band\b', text)
-                print(f"   Split into {len(parts)} part(s): {parts}")
+                parts = _SPLIT_RE.split(text)
+                log.debug("   Split into %d part(s): %s", len(parts), parts)
                 
                 for part in parts:
                     part = part.strip()
                     if not part:
                         continue
                     
-                    print(f"   Processing part: '{part}'")
+                    log.debug("   Processing part: '%s'", part)
                     matched = False
                     
                     # 2a. Check for slash commands (e.g. /water_monstera)
@@ -171,14 +365,14 @@ class PlantDB:
                             plant_query = cmd_plant.replace('_', ' ').strip()
                             
                             # Validate it's a known action
-                            if action in ACTION_KEYWORDS.values() or action in [v.upper() for v in ACTION_KEYWORDS.values()] or action in [k.upper() for k in ACTION_KEYWORDS.keys()] or action in ['WATER', 'FERTILIZE', 'MIST', 'ROTATE', 'MOVE', 'PRUNE', 'REPOT', 'CHECK']:
+                            if action in _VALID_ACTIONS:
                                 last_action = action
-                                print(f"      📱 Parsed slash command: action={action}, plant_query='{plant_query}'")
+                                log.debug("      📱 Parsed slash command: action=%s, plant_query='%s'", action, plant_query)
                             else:
-                                print(f"      ⚠️ Unknown action in command: {action}")
+                                log.debug("      ⚠️ Unknown action in command: %s", action)
                                 action = None
                         else:
-                            print(f"      ⚠️ Invalid command format: {part}")
+                            log.debug("      ⚠️ Invalid command format: %s", part)
                             action = None
                             plant_query = None
 
@@ -186,71 +380,78 @@ class PlantDB:
                     else:
                         action = None
                         plant_query = part
-                        for keyword, kw_action in ACTION_KEYWORDS.items():
-                            if keyword in part:
-                                action = kw_action
-                                last_action = action
-                                plant_query = part.replace(keyword, '').strip()
-                                print(f"      Found keyword '{keyword}' -> action={action}, plant_query='{plant_query}'")
-                                break
+                        m = _KW_RE.search(part)
+                        if m:
+                            keyword = m.group(1)
+                            action = ACTION_KEYWORDS[keyword]
+                            last_action = action
+                            plant_query = (part[:m.start()] + part[m.end():]).strip()
+                            log.debug("      Found keyword '%s' -> action=%s, plant_query='%s'", keyword, action, plant_query)
                     
                     # If no action found in this part, but we have a previous action, carry it over
                     if not action and last_action:
                         action = last_action
                         plant_query = part.strip()
-                        print(f"      Carrying over previous action '{action}' for plant_query='{plant_query}'")
+                        log.debug("      Carrying over previous action '%s' for plant_query='%s'", action, plant_query)
                     
                     if not action:
-                        print(f"      ⚠️ No action keyword found and no previous action to carry over")
+                        log.debug("      ⚠️ No action keyword found and no previous action to carry over")
                         continue
                         
                     if not plant_query:
-                        print(f"      ⚠️ No plant name found")
+                        log.debug("      ⚠️ No plant name found")
                         continue
                     
                     # Simplify plant query for matching if it came from a slash command
                     search_query = plant_query
                     
-                    # Try to match plant name
-                    found_plant = False
-                    # Create a safe name for each row to match against slash commands
-                    for idx, row in self.df.iterrows():
-                        plant_name = row['Name']
-                        safe_name = "".join(c if c.isalnum() else "_" for c in plant_name.lower())
-                        safe_name = "_".join(filter(None, safe_name.split("_")))
-                        
-                        if search_query in plant_name.lower() or search_query == safe_name:
-                            found_plant = True
-                            print(f"      ✓ Matched plant: {plant_name}")
-                            
-                            # Update date columns for water/fertilize
-                            if action == 'WATER':
-                                self.df.at[idx, 'Last Watered'] = date
-                            elif action == 'FERTILIZE':
-                                self.df.at[idx, 'Last Fertilized'] = date
-                            
-                            # Log to history
-                            self.log_action(plant_name, action, date=date)
-                            
-                            # Clear this specific pending action
-                            curr_status = str(row.get('Status', ''))
-                            if f'PENDING_{action}' in curr_status:
-                                new_status = curr_status.replace(f'PENDING_{action}', '').strip('_')
-                                self.df.at[idx, 'Status'] = new_status if new_status.startswith('PENDING') else 'OK'
-                            
-                            changes = True
-                            print(f"      ✅ Marked {action} complete for {plant_name}")
+                    # Try to match plant name (substring, or exact safe name for slash commands)
+                    mask = names_lower.str.contains(search_query, regex=False) | (safe_names == search_query)
+                    if not mask.any():
+                        # Fall back to the closest name, so typos like "monstra" still land
+                        best = None
+                        if len(search_query) >= FUZZY_MIN_LENGTH:
+                            best = process.extractOne(search_query, names_lower, scorer=fuzz.ratio, score_cutoff=FUZZY_CUTOFF)
+                        if not best:
+                            log.debug("      ⚠️ No matching plant found for '%s'", search_query)
+                            continue
+                        log.debug("      🔎 Fuzzy matched '%s' -> '%s' (score %.0f)", search_query, best[0], best[1])
+                        mask = names_lower.index.to_series(index=names_lower.index) == best[2]
+                    
+                    matched_names = self.df.loc[mask, 'Name'].tolist()
+                    log.debug("      ✓ Matched plant(s): %s", matched_names)
+                    
+                    # Update date columns for water/fertilize
+                    if action in DATE_COLUMNS:
+                        self._set(mask, DATE_COLUMNS[action], date)
+                    
+                    # Log to history
+                    for plant_name in matched_names:
+                        self.log_action(plant_name, action, date=date)
+                    
+                    # Clear this specific pending action
+                    statuses = self.df['Status'].astype(str)
+                    pending = mask & statuses.str.contains(f'PENDING_{action}', regex=False)
+                    if pending.any():
+                        new_status = statuses[pending].str.replace(f'PENDING_{action}', '', regex=False).str.strip('_')
+                        self._set(pending, 'Status', new_status.where(new_status.str.startswith('PENDING'), 'OK'))
                     
-                    if not found_plant:
-                        print(f"      ⚠️ No matching plant found for '{search_query}'")
+                    changes = True
+                    log.info("      ✅ Marked %s complete for %s", action, ", ".join(map(str, matched_names)))
                     
                     matched = True
 
-        if changes:
-            self.save()
-        else:
+        self._buffering_history = False
+        # Status changes and the history rows go out together
+        self.flush()
+        
+        if not changes:
             print("📭 No changes made to database")
         
+        # Only now that the sheet has them are the replies confirmed; if a write
+        # raised, the next run fetches them again
+        confirm_messages(next_offset)
+        
         return changes
 
     def mark_pending(self, tasks):
@@ -262,9 +463,9 @@ class PlantDB:
             name = t['name']
             action = t['action'].upper()
             
-            mask = self.df['Name'] == name
-            if mask.any():
-                current = str(self.df.loc[mask, 'Status'].values[0])
+            labels = self._name_to_idx.get(name)
+            if labels:
+                current = str(self.df.at[labels[0], 'Status'])
                 
                 # Check if this action is already pending (avoid duplicates like CHECK_CHECK)
                 # Split current status into parts and check if action already exists
@@ -281,11 +482,86 @@ class PlantDB:
                 else:
                     new_status = f"PENDING_{action}"
                 
-                self.df.loc[mask, 'Status'] = new_status
+                for label in labels:
+                    self._set(label, 'Status', new_status)
         
         self.save()
 
+    def _set(self, rows, col, value):
+        """Updates cell(s) in the DataFrame and marks them for the next save().
+        
+        rows is either an index label or a boolean mask over self.df; with a mask,
+        value may be a scalar or a Series aligned on the index.
+        """
+        self.df.loc[rows, col] = value
+        labels = self.df.index[rows.values] if isinstance(rows, pd.Series) else [rows]
+        self._dirty.update((label, col) for label in labels)
+
+    def _dirty_cells(self):
+        """(row, column, value) for each changed Plants cell in sheet order, 0-based with the header as row 0."""
+        cells = []
+        for idx, col in sorted(self._dirty, key=lambda cell: (self.df.index.get_loc(cell[0]), cell[1])):
+            value = self.df.at[idx, col]
+            if hasattr(value, 'item'):
+                value = value.item()  # numpy scalar -> JSON-serializable Python value
+            cells.append((self.df.index.get_loc(idx) + 1, self._sheet_columns.index(col), value))
+        return cells
+
     def save(self):
-        """Writes the DataFrame back to Google Sheets."""
-        self.worksheet.update([self.df.columns.values.tolist()] + self.df.values.tolist())
-        print("💾 Database saved.")
\ No newline at end of file
+        """Writes changed cells back to Google Sheets in one batch request."""
+        if not self._dirty:
+            return
+        
+        if any(col not in self._sheet_columns for _, col in self._dirty):
+            # A new column was added, rewrite the whole sheet so the header goes with it
+            self.worksheet.update([self.df.columns.values.tolist()] + self.df.values.tolist())
+            self._sheet_columns = self.df.columns.tolist()
+        else:
+            updates = [
+                {'range': rowcol_to_a1(row + 1, col + 1), 'values': [[value]]}
+                for row, col, value in self._dirty_cells()
+            ]
+            self.worksheet.batch_update(updates, value_input_option='RAW')
+        
+        self._dirty.clear()
+        print("💾 Database saved.")
+
+    def flush(self):
+        """Writes changed Plants cells and buffered history rows in one spreadsheets.batchUpdate.
+
+        History goes in as an appendCells request, so like append_rows it lands
+        after whatever is on the sheet at write time, never over rows added since
+        load. A new Plants column falls back to save() + flush_history(), since
+        its header has to be rewritten.
+        """
+        if any(col not in self._sheet_columns for _, col in self._dirty):
+            self.save()
+            self.flush_history()
+            return
+        
+        updates = [{
+            'updateCells': {
+                'start': {'sheetId': self.worksheet.id, 'rowIndex': row, 'columnIndex': col},
+                'rows': [{'values': [_cell_data(value)]}],
+                'fields': 'userEnteredValue',
+            }
+        } for row, col, value in self._dirty_cells()]
+        buffer = self._history_buffer
+        if buffer:
+            updates.append({
+                'appendCells': {
+                    'sheetId': self.history_ws.id,
+                    'rows': [{'values': [_cell_data(value) for value in row]} for row in buffer],
+                    'fields': 'userEnteredValue',
+                }
+            })
+        if not updates:
+            return
+        
+        self.spreadsheet.batch_update({'requests': updates})
+        if self._dirty:
+            print("💾 Database saved.")
+        if buffer:
+            print(f"📝 Logged {len(buffer)} action(s) to {HISTORY_WORKSHEET}")
+        self._dirty.clear()
+        self._history_buffer = []
@@ -1,50 +1,174 @@
-import requests
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
+from src.http_client import SESSION
 from src.config import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
 
 BASE_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
 
+# Next getUpdates offset (last processed update_id + 1), kept between runs
+OFFSET_FILE = Path(__file__).parent.parent / "data" / "telegram_offset"
+
+
+def _load_offset():
+    """Returns the stored getUpdates offset, or None if we've never polled."""
+    try:
+        return int(OFFSET_FILE.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _save_offset(offset):
+    """Persist the next getUpdates offset."""
+    try:
+        OFFSET_FILE.parent.mkdir(parents=True, exist_ok=True)
+        OFFSET_FILE.write_text(str(offset))
+    except OSError as e:
+        print(f"⚠️ Telegram offset save error: {e}")
+
+# Telegram message limit is 4096 chars, leave some headroom (also room for the "(i/N)" suffix)
+MAX_LENGTH = 4000
+
+# Concurrent sends for multi-chunk messages, kept small for Telegram's per-chat rate limit
+SEND_MAX_WORKERS = 4
+
+
+def _pack(pieces, sep, limit):
+    """Greedily join pieces with sep into chunks of at most `limit` chars.
+
+    Keeps a list of pieces and a running length, so each chunk is joined once
+    instead of being re-copied on every append.
+    """
+    buf, size = [], 0
+    for piece in pieces:
+        if buf and size + len(sep) + len(piece) > limit:
+            yield sep.join(buf)
+            buf, size = [], 0
+        size += len(piece) + (len(sep) if buf else 0)
+        buf.append(piece)
+    if buf:
+        yield sep.join(buf)
+
+
+def _split_lines(text, limit):
+    """Split an oversized paragraph on line boundaries, hard-cutting overlong lines."""
+    def pieces():
+        for line in text.split('\n'):
+            # A hard-cut line stands alone: its full-width slices can't share a chunk
+            while len(line) > limit:
+                yield None
+                yield line[:limit]
+                yield None
+                line = line[limit:]
+            yield line
+
+    # None marks a forced chunk boundary
+    for run in _runs(pieces()):
+        yield from filter(None, _pack(run, '\n', limit))
+
+
+def _runs(pieces):
+    """Group an iterable into lists separated by None markers."""
+    run = []
+    for piece in pieces:
+        if piece is None:
+            if run:
+                yield run
+            run = []
+        else:
+            run.append(piece)
+    if run:
+        yield run
+
+
+def _chunks(message, limit=MAX_LENGTH):
+    """Split a message into chunks of at most `limit` chars, preferring paragraph breaks."""
+    run = []
+    for paragraph in message.split('\n\n'):
+        if len(paragraph) > limit:
+            yield from _pack(run, '\n\n', limit)
+            run = []
+            yield from _split_lines(paragraph, limit)
+        else:
+            run.append(paragraph)
+    yield from _pack(run, '\n\n', limit)
+
+
+def _send_one(text):
+    """Posts a single message chunk, logging (not raising) on failure."""
+    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": text, "parse_mode": "HTML"}
+    response = None
+    try:
+        response = SESSION.post(f"{BASE_URL}/sendMessage", json=payload, timeout=5)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"⚠️ Telegram Send Error: {e}")
+        if response is not None:
+            print(f"   Telegram API Response: {response.text}")
+
+
 def send_alert(message):
-    """Sends a push notification to your phone. Chunks messages over 4000 chars."""
-    url = f"{BASE_URL}/sendMessage"
+    """Sends a push notification to your phone. Chunks messages over MAX_LENGTH chars."""
+    # Skip whitespace-only pieces, Telegram rejects empty messages
+    chunks = list(filter(str.strip, _chunks(message)))
+    if not chunks:
+        return
+    if len(chunks) == 1:
+        _send_one(chunks[0])
+        return
     
-    # Telegram message limit is 4096 chars. Split safely if needed.
-    MAX_LENGTH = 4000
-    
-    # Simple split by lines to avoid breaking formatting
-    chunks = []
-    current_chunk = ""
-    
-    for line in message.split('\n'):
-        if len(current_chunk) + len(line) + 1 > MAX_LENGTH:
-            chunks.append(current_chunk)
-            current_chunk = line
-        else:
-            current_chunk += ('\n' + line if current_chunk else line)
-            
-    if current_chunk:
-        chunks.append(current_chunk)
-        
-    for chunk in chunks:
-        payload = {"chat_id": TELEGRAM_CHAT_ID, "text": chunk, "parse_mode": "HTML"}
-        try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-        except Exception as e:
-            print(f"⚠️ Telegram Send Error: {e}")
-            if 'response' in locals() and hasattr(response, 'text'):
-                print(f"   Telegram API Response: {response.text}")
+    # Chunks go out concurrently and may arrive out of order, so number them
+    total = len(chunks)
+    numbered = [f"{chunk}\n({i}/{total})" for i, chunk in enumerate(chunks, 1)]
+    with ThreadPoolExecutor(max_workers=min(SEND_MAX_WORKERS, total)) as pool:
+        list(pool.map(_send_one, numbered))
+
+
+def _acknowledge(offset):
+    """Confirm updates below offset with Telegram, so it stops returning them.
+
+    Makes the ack independent of the local offset file, which doesn't survive
+    on ephemeral CI runners. limit=1 keeps the response tiny.
+    """
+    try:
+        SESSION.get(f"{BASE_URL}/getUpdates", params={"offset": offset, "limit": 1, "timeout": 0}, timeout=5)
+    except Exception as e:
+        print(f"⚠️ Telegram ack error: {e}")
+
+
+def confirm_messages(next_offset):
+    """Mark updates below next_offset as processed, locally and with Telegram.
+
+    Call only once the messages from get_recent_messages() have been applied,
+    so a failed run sees them again next time.
+    """
+    if next_offset is None:
+        return
+    _save_offset(next_offset)
+    _acknowledge(next_offset)
+
 
 def get_recent_messages(hours=24):
-    """Fetches text messages sent to the bot in the last N hours."""
+    """Fetches text messages sent to the bot since the last poll.
+
+    Uses the stored update offset so Telegram only returns new updates. The
+    last-N-hours cutoff only applies when no offset has been stored yet.
+    Returns (messages, next_offset); pass next_offset to confirm_messages()
+    once the messages are handled (None if there were no updates).
+    """
     url = f"{BASE_URL}/getUpdates"
+    offset = _load_offset()
+    params = {"allowed_updates": '["message"]', "timeout": 0}
+    if offset is not None:
+        params["offset"] = offset
     try:
-        response = requests.get(url)
-        if response.status_code != 200: return []
+        response = SESSION.get(url, params=params, timeout=5)
+        if response.status_code != 200: return [], None
         
-        updates = response.json().get('result', [])
+        updates = orjson.loads(response.content).get('result', [])
         valid_msgs = []
-        cutoff = datetime.now() - timedelta(hours=hours)
+        cutoff = datetime.now() - timedelta(hours=hours) if offset is None else None
         
         for u in updates:
             if 'message' in u:
@@ -52,12 +176,14 @@ def get_recent_messages(hours=24):
                 # Telegram timestamp is integer seconds
                 msg_time = datetime.fromtimestamp(msg['date'])
                 
-                if msg_time > cutoff and 'text' in msg:
+                if (cutoff is None or msg_time > cutoff) and 'text' in msg:
                     valid_msgs.append({
                         "text": msg['text'].lower(),
                         "date": msg_time.strftime('%Y-%m-%d')
                     })
-        return valid_msgs
+        
+        next_offset = max(u['update_id'] for u in updates) + 1 if updates else None
+        return valid_msgs, next_offset
     except Exception as e:
         print(f"⚠️ Telegram Fetch Error: {e}")
-        return []
\ No newline at end of file
+        return [], None
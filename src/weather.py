@@ -1,13 +1,85 @@
-import requests
+import functools
+import time
+import orjson
+from datetime import date
+from src.cache import cache_get, cache_put
+from src.http_client import SESSION
 from src.config import LATITUDE, LONGITUDE
 
+# The daily forecast only changes a few times per day
+CACHE_TTL_HOURS = 3
+# Repeat calls within one run reuse the last result without touching the disk cache
+MEMO_TTL_MINUTES = 15
+
+# (cache key, 15-minute bucket) -> forecast, holds at most one entry
+_memo = {}
+
+
+def _cache_key():
+    """Key the cache on location and local date, so "today" moves on at midnight."""
+    return f"weather:{LATITUDE}:{LONGITUDE}:{date.today().isoformat()}"
+
+
+def _memo_key():
+    """The disk cache key plus a coarse time bucket, so memoized entries age out."""
+    return _cache_key(), int(time.time() // (MEMO_TTL_MINUTES * 60))
+
+
+def disk_cached(fetch):
+    """Serve the forecast from memory or the disk cache while fresh, falling back to disk on API errors."""
+    @functools.wraps(fetch)
+    def wrapper(force_refresh=False):
+        key = _cache_key()
+        memo_key = _memo_key()
+
+        if not force_refresh:
+            if memo_key in _memo:
+                return _memo[memo_key]
+            cached = cache_get(key, ttl_seconds=CACHE_TTL_HOURS * 3600)
+            if cached:
+                print("📂 Using cached weather forecast")
+                _memo.clear()
+                _memo[memo_key] = cached
+                return cached
+
+        daily = fetch()
+        if daily:
+            cache_put(key, daily)
+            _memo.clear()
+            _memo[memo_key] = daily
+            return daily
+
+        # API unavailable - an older forecast from today is better than none
+        stale = cache_get(key)
+        if stale:
+            print("⚠️ Using stale cached weather forecast")
+            return stale
+        return None
+    return wrapper
+
+
+# Only the fields the agent prompt uses
+DAILY_FIELDS = ["temperature_2m_max", "precipitation_sum"]
+
+
+@disk_cached
 def get_forecast():
     """Fetches past 3 days and today's forecast."""
-    url = (f"https://api.open-meteo.com/v1/forecast?latitude={LATITUDE}&longitude={LONGITUDE}"
-           f"&daily=temperature_2m_max,precipitation_sum&past_days=3&forecast_days=1&timezone=auto")
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        "latitude": LATITUDE,
+        "longitude": LONGITUDE,
+        "daily": ",".join(DAILY_FIELDS),
+        "past_days": 3,
+        "forecast_days": 1,
+        "timezone": "auto",
+    }
     try:
-        response = requests.get(url).json()
-        return response.get('daily')
+        response = SESSION.get(url, params=params, timeout=5)
+        response.raise_for_status()
+        daily = orjson.loads(response.content).get('daily') or {}
+        # Drop the 'time' axis and anything else we don't feed to the agent
+        return {field: daily[field] for field in DAILY_FIELDS if field in daily} or None
     except Exception as e:
         print(f"⚠️ Weather API Error: {e}")
-        return None
\ No newline at end of file
+        return None